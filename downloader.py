@@ -4,17 +4,23 @@ Handles downloading YouTube videos with high quality
 """
 
 import os
+import re
+import fnmatch
 import tempfile
 import logging
-from pathlib import Path
-from typing import Tuple, Optional, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Tuple, Optional, Dict, Any, List, Callable
 
 try:
     import yt_dlp
 except ImportError:
     raise ImportError("yt-dlp not installed. Run: pip install yt-dlp")
 
-from utils import handle_error
+from utils import handle_error, get_cache, remove_file_async, METADATA_CACHE_TTL
+
+# Temporary download files removed by cleanup_temp_files
+_TEMP_FILE_PATTERNS = ('*.mp4', '*.webm', '*.mkv', '*.part')
 
 class VideoDownloader:
     """Handles video downloading from YouTube using yt-dlp"""
@@ -32,7 +38,8 @@ class VideoDownloader:
         # yt-dlp options for high quality download
         self.ydl_opts = {
             'format': 'best[height<=1080][ext=mp4]/best[ext=mp4]/best',
-            'outtmpl': os.path.join(self.temp_dir, '%(title)s.%(ext)s'),
+            # Named by video ID so concurrent downloads never share a temp file
+            'outtmpl': os.path.join(self.temp_dir, '%(id)s.%(ext)s'),
             'quiet': True,
             'no_warnings': True,
             'extractaudio': False,
@@ -40,75 +47,189 @@ class VideoDownloader:
             'embed_subs': False,
             'writesubtitles': False,
             'writeautomaticsub': False,
+            'progress_hooks': [self._check_stopped],
         }
+        
+        # YoutubeDL instances are not thread-safe, so each thread gets its own
+        self._local = threading.local()
+        self._ydls: List['yt_dlp.YoutubeDL'] = []
+        self._ydls_lock = threading.Lock()
+        
+        # Set by stop() to abort running downloads and skip queued ones
+        self._stop_event = threading.Event()
+    
+    def _get_ydl(self) -> 'yt_dlp.YoutubeDL':
+        """
+        Get this thread's YoutubeDL instance, creating it on first use
+        
+        Reusing the instance keeps extractors, cookies and the HTTP session
+        alive between downloads.
+        
+        Returns:
+            YoutubeDL instance for the current thread
+        """
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+            self._local.ydl = ydl
+            with self._ydls_lock:
+                self._ydls.append(ydl)
+        return ydl
+    
+    def close(self):
+        """
+        Close every YoutubeDL instance created by this downloader
+        
+        Shuts down their HTTP sessions and saves cookies. Threads that
+        download again afterwards get a fresh instance.
+        """
+        with self._ydls_lock:
+            ydls, self._ydls = self._ydls, []
+        self._local = threading.local()
+        
+        for ydl in ydls:
+            try:
+                ydl.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing YoutubeDL instance: {e}")
     
-    def download(self, url: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    def stop(self):
+        """
+        Stop downloading
+        
+        Downloads in progress are aborted at their next progress update and
+        their partial files removed; any later download returns immediately.
+        Safe to call from another thread.
+        """
+        self._stop_event.set()
+    
+    def _check_stopped(self, status: Dict[str, Any]):
+        """
+        yt-dlp progress hook that aborts the download once stop() was called
+        
+        Args:
+            status: Progress status dictionary from yt-dlp
+        """
+        if self._stop_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Download stopped")
+    
+    def download(self, url: str, label: str = "") -> Tuple[Optional[str], Dict[str, Any]]:
         """
         Download video from YouTube URL
         
         Args:
             url: YouTube video URL
+            label: Prefix for progress messages, e.g. "[1/3] "
             
         Returns:
             Tuple of (video_path, video_info) or (None, {}) if failed
         """
+        if self._stop_event.is_set():
+            return None, {}
+        
+        video_id = None
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                # Extract video info first
-                self.logger.info(f"Extracting info for: {url}")
-                info = ydl.extract_info(url, download=False)
-                
-                if not info:
-                    self.logger.error("Could not extract video info")
-                    return None, {}
-                
-                # Check video duration (avoid extremely long videos)
-                duration = info.get('duration', 0)
-                if duration > 3600:  # 1 hour limit
-                    self.logger.warning(f"Video too long: {duration}s, skipping")
-                    print(f"⚠️ Video is too long ({duration//60} minutes), skipping...")
-                    return None, {}
-                
-                # Download the video
-                self.logger.info(f"Downloading: {info.get('title', 'Unknown')}")
-                ydl.download([url])
-                
-                # Find the downloaded file
-                expected_path = ydl.prepare_filename(info)
-                
-                # Handle different possible extensions
-                possible_paths = [
-                    expected_path,
-                    expected_path.rsplit('.', 1)[0] + '.mp4',
-                    expected_path.rsplit('.', 1)[0] + '.webm',
-                    expected_path.rsplit('.', 1)[0] + '.mkv'
-                ]
-                
-                video_path = None
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        video_path = path
-                        break
-                
-                if not video_path:
-                    self.logger.error("Downloaded file not found")
-                    return None, {}
-                
-                self.logger.info(f"Successfully downloaded: {video_path}")
-                return video_path, info
-                
+            ydl = self._get_ydl()
+            
+            # Extract video info first (unprocessed, so the download below
+            # can reuse it instead of fetching the page a second time)
+            self.logger.info(f"Extracting info for: {url}")
+            info = ydl.extract_info(url, download=False, process=False)
+            
+            if not info:
+                self.logger.error("Could not extract video info")
+                return None, {}
+            
+            # Check video duration (avoid extremely long videos)
+            duration = info.get('duration', 0)
+            if duration > 3600:  # 1 hour limit
+                self.logger.warning(f"Video too long: {duration}s, skipping")
+                print(f"⚠️ {label}Video is too long ({duration//60} minutes), skipping...")
+                return None, {}
+            
+            video_id = info.get('id')
+            if self._stop_event.is_set():
+                return None, {}
+            
+            # Download the video from the already extracted info
+            self.logger.info(f"Downloading: {info.get('title', 'Unknown')}")
+            info = ydl.process_ie_result(info, download=True)
+            
+            # yt-dlp records the final path (after any merge/remux)
+            requested = info.get('requested_downloads') or []
+            video_path = requested[-1].get('filepath') if requested else info.get('_filename')
+            
+            if not video_path:
+                self.logger.error("Downloaded file not found")
+                return None, {}
+            
+            self.logger.info(f"Successfully downloaded: {video_path}")
+            return video_path, info
+            
+        except yt_dlp.utils.DownloadCancelled:
+            self.logger.info(f"Download stopped: {url}")
+            if video_id:
+                # Remove the partial file yt-dlp leaves behind
+                self.cleanup_temp_files([f"{video_id}.*"])
+            return None, {}
+            
         except yt_dlp.DownloadError as e:
             error_msg = handle_error(e, "downloading video")
             self.logger.error(f"Download error: {e}")
-            print(f"❌ Download failed: {error_msg}")
+            print(f"❌ {label}Download failed: {error_msg}")
             return None, {}
             
         except Exception as e:
             error_msg = handle_error(e, "downloading video")
             self.logger.error(f"Unexpected error: {e}")
-            print(f"❌ Unexpected error: {error_msg}")
+            print(f"❌ {label}Unexpected error: {error_msg}")
             return None, {}
     
+    def download_many(self, urls: List[str], max_workers: int = 4,
+                      callback: Optional[Callable[[str, Tuple[Optional[str], Dict[str, Any]]], None]] = None,
+                      labels: Optional[Dict[str, str]] = None
+                      ) -> Dict[str, Tuple[Optional[str], Dict[str, Any]]]:
+        """
+        Download several videos concurrently
+        
+        Each worker thread uses its own YoutubeDL instance, since those
+        are not safe to share between threads. After stop(), the remaining
+        URLs finish immediately with a (None, {}) result.
+        
+        Args:
+            urls: YouTube video URLs
+            max_workers: Maximum number of simultaneous downloads
+            callback: Optional function called with (url, result) as each download finishes
+            labels: Optional message prefix for each URL, passed to download()
+            
+        Returns:
+            Dictionary mapping each URL to its (video_path, video_info) result
+        """
+        results = {}
+        if not urls:
+            return results
+        labels = labels or {}
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(self.download, url, labels.get(url, "")): url
+                           for url in urls}
+                for future in as_completed(futures):
+                    url = futures[future]
+                    try:
+                        results[url] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Unexpected error downloading {url}: {e}")
+                        results[url] = (None, {})
+                    
+                    if callback:
+                        callback(url, results[url])
+        finally:
+            # Worker threads are gone once the executor exits, so close their instances
+            self.close()
+        
+        return results
+    
     def get_video_info(self, url: str) -> Optional[Dict[str, Any]]:
         """
         Get video information without downloading
@@ -119,9 +240,27 @@ class VideoDownloader:
         Returns:
             Video info dictionary or None if failed
         """
+        cache_key = ('video_info', url)
+        try:
+            cache = get_cache()
+            if cache is not None:
+                info = cache.get(cache_key)
+                if info is not None:
+                    self.logger.debug("Using cached video info for: %s", url)
+                    return info
+        except Exception as e:
+            self.logger.warning(f"Metadata cache unavailable, continuing without it: {e}")
+            cache = None
+        
         try:
             with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
                 info = ydl.extract_info(url, download=False)
+                if info and cache is not None:
+                    info = ydl.sanitize_info(info)
+                    try:
+                        cache.set(cache_key, info, expire=METADATA_CACHE_TTL)
+                    except Exception as e:
+                        self.logger.warning(f"Could not cache video info: {e}")
                 return info
         except Exception as e:
             self.logger.error(f"Error getting video info: {e}")
@@ -135,13 +274,18 @@ class VideoDownloader:
             patterns: List of file patterns to clean (optional)
         """
         if patterns is None:
-            patterns = ['*.mp4', '*.webm', '*.mkv', '*.part']
-        
-        temp_path = Path(self.temp_dir)
-        for pattern in patterns:
-            for file in temp_path.glob(pattern):
-                try:
-                    file.unlink()
-                    self.logger.debug(f"Cleaned up: {file}")
-                except Exception as e:
-                    self.logger.warning(f"Could not clean up {file}: {e}")
+            patterns = _TEMP_FILE_PATTERNS
+        
+        # One directory scan, matched against all patterns in a single regex
+        pattern_re = re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+        try:
+            with os.scandir(self.temp_dir) as entries:
+                files = [entry.path for entry in entries
+                         if pattern_re.match(entry.name) and entry.is_file()]
+        except FileNotFoundError:
+            # Nothing was ever downloaded into a directory that doesn't exist
+            return
+        
+        # Hand deletion to the background worker
+        for file in files:
+            remove_file_async(file)
\ No newline at end of file
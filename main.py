@@ -4,21 +4,34 @@ ClipLord - TikTok Video Generator
 Main script that orchestrates the entire pipeline
 """
 
-import os
-import sys
 import argparse
+import queue
+import threading
 from pathlib import Path
 import logging
 from typing import List, Optional
 
 from downloader import VideoDownloader
 from processor import VideoProcessor
-from subtitle import SubtitleGenerator
-from utils import setup_logging, validate_url, clean_filename, handle_error
+from subtitle import SubtitleGenerator, BACKENDS
+from utils import (setup_logging, validate_url, extract_video_id, clean_filename, handle_error,
+                   set_cache_enabled, clear_cache, remove_file_async)
+
+# Number of simultaneous yt-dlp downloads
+MAX_DOWNLOAD_WORKERS = 4
 
 def main():
     """Main function to orchestrate the video processing pipeline"""
     
+    parser = argparse.ArgumentParser(description="ClipLord - TikTok Video Generator")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Don't read or write cached metadata and transcripts")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="Clear cached metadata and transcripts before running")
+    parser.add_argument('--backend', choices=BACKENDS, default="whisper",
+                        help="Transcription backend (default: whisper)")
+    args = parser.parse_args()
+    
     # Setup logging
     setup_logging()
     logger = logging.getLogger(__name__)
@@ -26,6 +39,13 @@ def main():
     print("🎬 ClipLord - TikTok Video Generator")
     print("=" * 50)
     
+    if args.clear_cache:
+        if clear_cache():
+            print("🧹 Cache cleared")
+        else:
+            print("⚠️ diskcache not installed, nothing to clear")
+    set_cache_enabled(not args.no_cache)
+    
     # Get YouTube URLs from user
     urls_input = input("Paste YouTube video URL(s) (comma-separated): ").strip()
     if not urls_input:
@@ -35,10 +55,17 @@ def main():
     # Parse and validate URLs
     urls = [url.strip() for url in urls_input.split(',')]
     valid_urls = []
+    seen_video_ids = set()
     
     for url in urls:
         if validate_url(url):
-            valid_urls.append(url)
+            # Different URL forms can point at the same video
+            video_id = extract_video_id(url)
+            if video_id in seen_video_ids:
+                print(f"⏭️ Skipping duplicate video: {url}")
+            else:
+                seen_video_ids.add(video_id)
+                valid_urls.append(url)
         else:
             print(f"❌ Invalid URL: {url}")
     
@@ -53,70 +80,182 @@ def main():
     # Initialize components
     downloader = VideoDownloader()
     processor = VideoProcessor()
-    subtitle_gen = SubtitleGenerator()
+    subtitle_gen = SubtitleGenerator(backend=args.backend)
     
+    total = len(valid_urls)
     successful_processes = 0
     
-    # Process each URL
-    for i, url in enumerate(valid_urls, 1):
-        print(f"\n🔄 Processing video {i}/{len(valid_urls)}")
-        print(f"URL: {url}")
+    # Stage queues: download -> transcribe -> encode. A None item is the
+    # shutdown sentinel and is forwarded downstream by each stage.
+    dl_q = queue.Queue()
+    asr_q = queue.Queue(maxsize=2)
+    enc_q = queue.Queue(maxsize=2)
+    
+    # Set on Ctrl-C so finished downloads are dropped instead of queued
+    stop_event = threading.Event()
+    # Set once the download stage has handed over its last video
+    downloads_done = threading.Event()
+    # Downloaded videos a later stage still has to consume and delete
+    in_flight = set()
+    in_flight_lock = threading.Lock()
+    
+    def release(video_path: str):
+        """Delete a downloaded video once no later stage needs it"""
+        with in_flight_lock:
+            in_flight.discard(video_path)
+        remove_file_async(video_path)
+    
+    def report_error(i: int, url: str, e: Exception):
+        error_msg = handle_error(e, f"processing video from {url}")
+        print(f"❌ [{i}/{total}] {error_msg}")
+        logger.error(f"Error processing {url}: {e}")
+    
+    def download_worker():
+        """Stage 1: download videos concurrently (network bound)"""
+        pending = {}
+        while True:
+            item = dl_q.get()
+            if item is None:
+                break
+            i, url = item
+            pending[url] = i
         
-        try:
-            # Step 1: Download video
-            print("📥 Downloading video...")
-            video_path, video_info = downloader.download(url)
-            if not video_path:
-                print("❌ Failed to download video")
-                continue
+        def on_downloaded(url: str, result):
+            i = pending[url]
+            video_path, video_info = result
+            if stop_event.is_set():
+                # Interrupted: nothing downstream will consume this download
+                if video_path:
+                    remove_file_async(video_path)
+                return
             
-            video_title = clean_filename(video_info.get('title', 'unknown'))
-            print(f"✅ Downloaded: {video_title}")
+            print(f"\n🔄 Processing video {i}/{total}")
+            print(f"URL: {url}")
             
-            # Step 2: Generate subtitles
-            print("🎤 Generating subtitles...")
-            subtitles = subtitle_gen.generate_subtitles(video_path)
-            if not subtitles:
-                print("⚠️ No subtitles generated, continuing without subtitles...")
-            else:
-                print(f"✅ Generated {len(subtitles)} subtitle segments")
+            try:
+                if not video_path:
+                    print(f"❌ [{i}/{total}] Failed to download video")
+                    return
+                
+                video_title = clean_filename(video_info.get('title', 'unknown'))
+                print(f"✅ [{i}/{total}] Downloaded: {video_title}")
+                with in_flight_lock:
+                    in_flight.add(video_path)
+                asr_q.put((i, url, video_path, video_title))
+            except Exception as e:
+                report_error(i, url, e)
+        
+        print(f"📥 Downloading {len(pending)} video(s)...")
+        try:
+            downloader.download_many(list(pending), max_workers=MAX_DOWNLOAD_WORKERS,
+                                     callback=on_downloaded,
+                                     labels={url: f"[{i}/{total}] " for url, i in pending.items()})
+        finally:
+            asr_q.put(None)
+            downloads_done.set()
+    
+    def transcribe_worker():
+        """Stage 2: generate subtitles (single Whisper instance, GPU/CPU bound)"""
+        while True:
+            item = asr_q.get()
+            if item is None:
+                enc_q.put(None)
+                break
             
-            # Step 3: Process video (crop, trim, add subtitles)
-            print("✂️ Processing and cropping to 9:16...")
-            output_filename = f"{video_title}_tiktok.mp4"
-            output_path = output_dir / output_filename
+            i, url, video_path, video_title = item
+            print(f"🎤 [{i}/{total}] Generating subtitles...")
             
-            processed_path = processor.process_video(
-                video_path=video_path,
-                subtitles=subtitles,
-                output_path=output_path,
-                target_duration_range=(15, 60)
-            )
+            try:
+                subtitles = subtitle_gen.generate_subtitles(video_path, label=f"[{i}/{total}] ")
+                if not subtitles:
+                    print(f"⚠️ [{i}/{total}] No subtitles generated, continuing without subtitles...")
+                else:
+                    print(f"✅ [{i}/{total}] Generated {len(subtitles)} subtitle segments")
+                enc_q.put((i, url, video_path, video_title, subtitles))
+            except Exception as e:
+                report_error(i, url, e)
+                release(video_path)
+    
+    def encode_worker():
+        """Stage 3: crop, trim and burn in subtitles (ffmpeg encode bound)"""
+        nonlocal successful_processes
+        while True:
+            item = enc_q.get()
+            if item is None:
+                break
             
-            if processed_path:
-                duration = processor.get_video_duration(processed_path)
-                print(f"✅ Video processed successfully!")
-                print(f"📁 Output: {processed_path}")
-                print(f"⏱️ Duration: {duration:.1f} seconds")
-                successful_processes += 1
-            else:
-                print("❌ Failed to process video")
+            i, url, video_path, video_title, subtitles = item
+            print(f"✂️ [{i}/{total}] Processing and cropping to 9:16...")
             
-            # Cleanup temporary files
             try:
-                os.remove(video_path)
-            except:
-                pass
+                output_filename = f"{video_title}_tiktok.mp4"
+                output_path = output_dir / output_filename
+                
+                processed_path = processor.process_video(
+                    video_path=video_path,
+                    subtitles=subtitles,
+                    output_path=output_path,
+                    target_duration_range=(15, 60),
+                    label=f"[{i}/{total}] "
+                )
                 
-        except Exception as e:
-            error_msg = handle_error(e, f"processing video from {url}")
-            print(f"❌ {error_msg}")
-            logger.error(f"Error processing {url}: {e}")
-            continue
+                if processed_path:
+                    duration = processor.get_video_duration(processed_path)
+                    print(f"✅ [{i}/{total}] Video processed successfully!")
+                    print(f"📁 Output: {processed_path}")
+                    print(f"⏱️ Duration: {duration:.1f} seconds")
+                    successful_processes += 1
+                else:
+                    print(f"❌ [{i}/{total}] Failed to process video")
+            except Exception as e:
+                report_error(i, url, e)
+            finally:
+                # Cleanup temporary files
+                release(video_path)
+    
+    workers = [
+        threading.Thread(target=download_worker, name="cliplord-download", daemon=True),
+        threading.Thread(target=transcribe_worker, name="cliplord-transcribe", daemon=True),
+        threading.Thread(target=encode_worker, name="cliplord-encode", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+    
+    # Feed the pipeline
+    for i, url in enumerate(valid_urls, 1):
+        dl_q.put((i, url))
+    dl_q.put(None)
+    
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted, stopping downloads and cleaning up...")
+        stop_event.set()
+        downloader.stop()
+        
+        # Wait for the download stage to wind down, draining the transcribe
+        # queue so it can't stay blocked handing over a finished video. An
+        # event rather than is_alive(), which an interrupted join() can break.
+        while not downloads_done.wait(timeout=0.1):
+            try:
+                while True:
+                    asr_q.get_nowait()
+            except queue.Empty:
+                pass
+        
+        # The transcribe and encode threads die with the process, so delete
+        # every video they haven't cleaned up yet
+        with in_flight_lock:
+            leftovers = list(in_flight)
+            in_flight.clear()
+        for video_path in leftovers:
+            remove_file_async(video_path)
+        return
     
     # Summary
     print(f"\n🎉 Process Complete!")
-    print(f"✅ Successfully processed: {successful_processes}/{len(valid_urls)} videos")
+    print(f"✅ Successfully processed: {successful_processes}/{total} videos")
     print(f"📁 Output directory: {output_dir.absolute()}")
     
     if successful_processes > 0:
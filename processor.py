@@ -1,20 +1,42 @@
 """
 Video processing module for cropping, trimming, and adding subtitles
-Uses moviepy for video editing operations
+Uses ffmpeg directly, with moviepy as a fallback when ffmpeg isn't on PATH
 """
 
+import bisect
 import logging
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from fractions import Fraction
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 import re
 
 try:
-    from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
-    from moviepy.config import check_dependencies
+    from moviepy.editor import VideoFileClip, ImageClip, CompositeVideoClip
+    from moviepy.config import check_dependencies, get_setting
 except ImportError:
     raise ImportError("moviepy not installed. Run: pip install moviepy")
 
-from utils import handle_error
+try:
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    raise ImportError("Pillow not installed. Run: pip install Pillow")
+
+from utils import handle_error, write_srt
+
+# Subtitle text ending a sentence
+_END_RE = re.compile(r'[.!?]$')
+
+# Audio codecs that can be stream-copied into MP4 (None means no audio)
+_MP4_COPY_AUDIO_CODECS = frozenset({'aac', 'mp3', None})
+
+# Bold fonts tried in order for moviepy subtitle rendering
+_SUBTITLE_FONTS = ('Arial Bold.ttf', 'arialbd.ttf', 'Arial-Bold.ttf', 'DejaVuSans-Bold.ttf')
 
 class VideoProcessor:
     """Handles video processing operations"""
@@ -27,9 +49,32 @@ class VideoProcessor:
         self.target_aspect_ratio = 9 / 16
         self.target_width = 1080
         self.target_height = 1920
+        
+        # libass lays out SRT subtitles on a 384x288 canvas and scales it to the
+        # video, so these values match the moviepy style (60px bold white text,
+        # 3px black outline, 80% width, top edge at 75% height) on 1080x1920
+        self.subtitle_style = (
+            "Fontname=Arial,Bold=1,FontSize=9,PrimaryColour=&H00FFFFFF,"
+            "OutlineColour=&H00000000,BorderStyle=1,Outline=0.5,Shadow=0,"
+            "Alignment=8,MarginL=38,MarginR=38,MarginV=216"
+        )
+        
+        # Prefer a single ffmpeg pass; moviepy is only a fallback
+        self.use_ffmpeg = bool(shutil.which('ffmpeg') and shutil.which('ffprobe'))
+        if not self.use_ffmpeg:
+            self.logger.warning("ffmpeg/ffprobe not found on PATH, falling back to moviepy")
+        
+        # NVENC availability for the moviepy path, probed on first use
+        self._nvenc_available = None
+        
+        # Subtitle style for the moviepy path
+        self.subtitle_font_size = 60
+        self.subtitle_stroke_width = 3
+        self._subtitle_font = None
     
     def process_video(self, video_path: str, subtitles: List[Dict], 
-                     output_path: Path, target_duration_range: Tuple[int, int] = (15, 60)) -> Optional[str]:
+                     output_path: Path, target_duration_range: Tuple[int, int] = (15, 60),
+                     label: str = "") -> Optional[str]:
         """
         Main processing function: crop to 9:16, trim, and add subtitles
         
@@ -38,6 +83,234 @@ class VideoProcessor:
             subtitles: List of subtitle segments
             output_path: Path for output video
             target_duration_range: Min and max duration in seconds
+            label: Prefix for progress messages, e.g. "[1/3] "
+            
+        Returns:
+            Path to processed video or None if failed
+        """
+        if self.use_ffmpeg:
+            return self._process_with_ffmpeg(video_path, subtitles, output_path, target_duration_range, label)
+        return self._process_with_moviepy(video_path, subtitles, output_path, target_duration_range, label)
+    
+    def _process_with_ffmpeg(self, video_path: str, subtitles: List[Dict],
+                             output_path: Path, target_duration_range: Tuple[int, int],
+                             label: str = "") -> Optional[str]:
+        """
+        Crop, trim and burn in subtitles with a single ffmpeg invocation
+        
+        Args:
+            video_path: Path to input video
+            subtitles: List of subtitle segments
+            output_path: Path for output video
+            target_duration_range: Min and max duration in seconds
+            label: Prefix for progress messages, e.g. "[1/3] "
+            
+        Returns:
+            Path to processed video or None if failed
+        """
+        srt_path = None
+        try:
+            probe = self._probe_video(video_path)
+            if not probe or probe['duration'] <= 0:
+                self.logger.error("Invalid video duration")
+                return None
+            
+            crop = self._compute_crop(probe['width'], probe['height'])
+            
+            # Find optimal trim duration based on subtitles and target range
+            trim_duration = self._find_optimal_duration(
+                video_duration=probe['duration'],
+                subtitles=subtitles,
+                target_range=target_duration_range
+            )
+            if trim_duration < probe['duration']:
+                print(f"✂️ {label}Trimmed video to {trim_duration:.1f} seconds")
+            
+            # Dump subtitles once and let libass render them
+            if subtitles:
+                srt_file = tempfile.NamedTemporaryFile(suffix='.srt', delete=False)
+                srt_path = srt_file.name
+                srt_file.close()
+                write_srt(subtitles, srt_path)
+            
+            self.logger.info(f"Exporting to: {output_path}")
+            if not srt_path and self._can_stream_copy(probe):
+                # Already 1080x1920 H.264 with nothing to burn in: trim without re-encoding
+                self.logger.info("Source already matches target format, using stream copy")
+                try:
+                    self._run_ffmpeg_copy(video_path, output_path, trim_duration)
+                except RuntimeError as e:
+                    self.logger.warning(f"Stream copy failed, re-encoding instead: {e}")
+                    self._run_ffmpeg(video_path, output_path, crop, trim_duration, srt_path)
+            else:
+                self._run_ffmpeg(video_path, output_path, crop, trim_duration, srt_path)
+            
+            if srt_path:
+                print(f"📝 {label}Added subtitles to video")
+            
+            return str(output_path)
+            
+        except Exception as e:
+            error_msg = handle_error(e, "processing video")
+            self.logger.error(f"Video processing error: {e}")
+            print(f"❌ {label}Processing error: {error_msg}")
+            return None
+        
+        finally:
+            if srt_path:
+                try:
+                    os.remove(srt_path)
+                except OSError:
+                    pass
+    
+    def _run_ffmpeg(self, video_path: str, output_path: Path, crop: Tuple[int, int, int, int],
+                    trim_duration: float, srt_path: Optional[str] = None):
+        """
+        Run ffmpeg to crop to 9:16, scale, trim and optionally burn in subtitles
+        
+        Args:
+            video_path: Path to input video
+            output_path: Path for output video
+            crop: Crop rectangle as (width, height, x, y)
+            trim_duration: Output duration in seconds
+            srt_path: Optional SRT file to burn in
+            
+        Raises:
+            RuntimeError: If ffmpeg exits with an error
+        """
+        crop_w, crop_h, x, y = crop
+        filters = [
+            f"crop={crop_w}:{crop_h}:{x}:{y}",
+            f"scale={self.target_width}:{self.target_height}",
+        ]
+        if srt_path:
+            filters.append(
+                f"subtitles={self._escape_filter_path(srt_path)}"
+                f":force_style='{self.subtitle_style}'"
+            )
+        
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error',
+            '-t', f"{trim_duration:.3f}",
+            '-i', str(video_path),
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-vf', ','.join(filters),
+            '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac',
+            '-movflags', '+faststart',
+            str(output_path)
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    
+    def _run_ffmpeg_copy(self, video_path: str, output_path: Path, trim_duration: float):
+        """
+        Trim video with ffmpeg stream copy (no re-encode)
+        
+        The trim starts at 0, which is always a keyframe, so the output
+        starts cleanly; the end is cut at the nearest packet boundary.
+        
+        Args:
+            video_path: Path to input video
+            output_path: Path for output video
+            trim_duration: Output duration in seconds
+            
+        Raises:
+            RuntimeError: If ffmpeg exits with an error
+        """
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error',
+            '-i', str(video_path),
+            '-t', f"{trim_duration:.3f}",
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            str(output_path)
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    
+    def _can_stream_copy(self, probe: Dict[str, Any]) -> bool:
+        """
+        Check whether a probed video can be trimmed without re-encoding
+        
+        Args:
+            probe: Result of _probe_video
+            
+        Returns:
+            True if the video stream is already H.264 at the target resolution
+            and the audio (if any) can be copied into MP4 as-is
+        """
+        return (probe.get('width') == self.target_width and
+                probe.get('height') == self.target_height and
+                probe.get('codec') == 'h264' and
+                probe.get('audio_codec') in _MP4_COPY_AUDIO_CODECS)
+    
+    def _escape_filter_path(self, path: str) -> str:
+        """
+        Escape a file path for use inside an ffmpeg filter argument
+        
+        Args:
+            path: File path
+            
+        Returns:
+            Escaped path
+        """
+        path = str(path).replace('\\', '/').replace(':', '\\:')
+        return f"'{path}'"
+    
+    def _probe_video(self, video_path: str) -> Dict[str, Any]:
+        """
+        Read video stream parameters and duration with ffprobe
+        
+        Args:
+            video_path: Path to video file
+            
+        Returns:
+            Dictionary with codec, width, height, fps, audio, audio_codec and
+            duration, or empty dict if failed
+        """
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-show_entries', 'stream=codec_type,codec_name,width,height,r_frame_rate:format=duration',
+            '-of', 'json', str(video_path)
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            data = json.loads(result.stdout)
+            streams = data.get('streams', [])
+            stream = next(s for s in streams if s.get('codec_type') == 'video')
+            audio_stream = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+            frame_rate = stream.get('r_frame_rate', '0/1')
+            return {
+                'codec': stream.get('codec_name'),
+                'width': int(stream['width']),
+                'height': int(stream['height']),
+                'fps': 0.0 if frame_rate.endswith('/0') else float(Fraction(frame_rate)),
+                'audio': audio_stream is not None,
+                'audio_codec': audio_stream.get('codec_name') if audio_stream else None,
+                'duration': float(data['format']['duration'])
+            }
+        except (OSError, subprocess.CalledProcessError, ValueError, KeyError, StopIteration) as e:
+            self.logger.error(f"Error probing video: {e}")
+            return {}
+    
+    def _process_with_moviepy(self, video_path: str, subtitles: List[Dict],
+                              output_path: Path, target_duration_range: Tuple[int, int],
+                              label: str = "") -> Optional[str]:
+        """
+        Crop, trim and add subtitles with moviepy (used when ffmpeg is not on PATH)
+        
+        Args:
+            video_path: Path to input video
+            subtitles: List of subtitle segments
+            output_path: Path for output video
+            target_duration_range: Min and max duration in seconds
+            label: Prefix for progress messages, e.g. "[1/3] "
             
         Returns:
             Path to processed video or None if failed
@@ -64,7 +337,7 @@ class VideoProcessor:
             # Trim video
             if trim_duration < video.duration:
                 trimmed_video = cropped_video.subclip(0, trim_duration)
-                print(f"✂️ Trimmed video to {trim_duration:.1f} seconds")
+                print(f"✂️ {label}Trimmed video to {trim_duration:.1f} seconds")
             else:
                 trimmed_video = cropped_video
             
@@ -72,13 +345,21 @@ class VideoProcessor:
             final_video = trimmed_video
             if subtitles:
                 final_video = self._add_subtitles(trimmed_video, subtitles)
-                print("📝 Added subtitles to video")
+                print(f"📝 {label}Added subtitles to video")
             
             # Export final video
             self.logger.info(f"Exporting to: {output_path}")
+            if self._has_nvenc():
+                codec, preset, quality_params = 'h264_nvenc', 'fast', ['-cq', '23']
+            else:
+                codec, preset, quality_params = 'libx264', 'veryfast', ['-crf', '23']
+            
             final_video.write_videofile(
                 str(output_path),
-                codec='libx264',
+                codec=codec,
+                preset=preset,
+                threads=os.cpu_count(),
+                ffmpeg_params=quality_params + ['-movflags', '+faststart'],
                 audio_codec='aac',
                 temp_audiofile='temp-audio.m4a',
                 remove_temp=True,
@@ -98,9 +379,36 @@ class VideoProcessor:
         except Exception as e:
             error_msg = handle_error(e, "processing video")
             self.logger.error(f"Video processing error: {e}")
-            print(f"❌ Processing error: {error_msg}")
+            print(f"❌ {label}Processing error: {error_msg}")
             return None
     
+    def _has_nvenc(self) -> bool:
+        """
+        Check whether moviepy's ffmpeg can encode with NVIDIA NVENC
+        
+        Static ffmpeg builds often list h264_nvenc without a usable GPU, so
+        this runs a tiny test encode instead of parsing `ffmpeg -encoders`.
+        
+        Returns:
+            True if h264_nvenc works on this machine
+        """
+        if self._nvenc_available is None:
+            cmd = [
+                get_setting('FFMPEG_BINARY'), '-v', 'error',
+                '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+                '-c:v', 'h264_nvenc', '-f', 'null', '-'
+            ]
+            try:
+                result = subprocess.run(cmd, capture_output=True, timeout=30)
+                self._nvenc_available = result.returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                self._nvenc_available = False
+            
+            if self._nvenc_available:
+                self.logger.info("Using NVENC hardware encoder")
+        
+        return self._nvenc_available
+    
     def _crop_to_vertical(self, video: VideoFileClip) -> VideoFileClip:
         """
         Crop video to 9:16 vertical aspect ratio
@@ -113,31 +421,39 @@ class VideoProcessor:
         """
         # Get video dimensions
         w, h = video.size
+        crop_w, crop_h, x, y = self._compute_crop(w, h)
+        
+        if (crop_w, crop_h) != (w, h):
+            video = video.crop(x1=x, y1=y, width=crop_w, height=crop_h)
+        
+        # Resize to target dimensions
+        return video.resize((self.target_width, self.target_height))
+    
+    def _compute_crop(self, w: int, h: int) -> Tuple[int, int, int, int]:
+        """
+        Compute centered crop rectangle for 9:16 vertical aspect ratio
+        
+        Args:
+            w: Source width
+            h: Source height
+            
+        Returns:
+            Crop rectangle as (width, height, x, y)
+        """
         current_ratio = w / h
         
         if abs(current_ratio - self.target_aspect_ratio) < 0.01:
             # Already correct aspect ratio
-            return video.resize((self.target_width, self.target_height))
+            return w, h, 0, 0
         
         if current_ratio > self.target_aspect_ratio:
             # Video is too wide, crop horizontally
             new_width = int(h * self.target_aspect_ratio)
-            x_center = w // 2
-            x1 = x_center - new_width // 2
-            x2 = x_center + new_width // 2
-            
-            cropped = video.crop(x1=x1, x2=x2)
-        else:
-            # Video is too tall, crop vertically
-            new_height = int(w / self.target_aspect_ratio)
-            y_center = h // 2
-            y1 = y_center - new_height // 2
-            y2 = y_center + new_height // 2
-            
-            cropped = video.crop(y1=y1, y2=y2)
+            return new_width, h, (w - new_width) // 2, 0
         
-        # Resize to target dimensions
-        return cropped.resize((self.target_width, self.target_height))
+        # Video is too tall, crop vertically
+        new_height = int(w / self.target_aspect_ratio)
+        return w, new_height, 0, (h - new_height) // 2
     
     def _find_optimal_duration(self, video_duration: float, subtitles: List[Dict], 
                               target_range: Tuple[int, int]) -> float:
@@ -158,30 +474,35 @@ class VideoProcessor:
             # No subtitles, use middle of target range or video duration
             return min(max_duration, video_duration)
         
-        # Find subtitle segments that end with sentence-ending punctuation
-        sentence_endings = []
-        for subtitle in subtitles:
-            end_time = subtitle.get('end', 0)
-            text = subtitle.get('text', '').strip()
-            
-            # Check if text ends with sentence-ending punctuation
-            if re.search(r'[.!?]$', text) and min_duration <= end_time <= max_duration:
-                sentence_endings.append(end_time)
+        # Subtitles come out of Whisper in time order, so the ends inside
+        # the target range form one contiguous slice
+        ends = [subtitle.get('end', 0) for subtitle in subtitles]
+        lo = bisect.bisect_left(ends, min_duration)
+        hi = bisect.bisect_right(ends, max_duration, lo)
         
-        if sentence_endings:
-            # Prefer durations closer to the middle of target range
-            target_middle = (min_duration + max_duration) / 2
-            best_duration = min(sentence_endings, key=lambda x: abs(x - target_middle))
-            self.logger.info(f"Found natural break at {best_duration:.1f}s")
-            return best_duration
+        # Prefer durations closer to the middle of target range, favouring
+        # segments that end with sentence-ending punctuation
+        target_middle = (min_duration + max_duration) / 2
+        best_sentence_end = None
+        best_any_end = None
+        for i in range(lo, hi):
+            end_time = ends[i]
+            distance = abs(end_time - target_middle)
+            
+            if best_any_end is None or distance < abs(best_any_end - target_middle):
+                best_any_end = end_time
+            
+            if (_END_RE.search(subtitles[i].get('text', '').strip()) and
+                    (best_sentence_end is None or distance < abs(best_sentence_end - target_middle))):
+                best_sentence_end = end_time
         
-        # No good sentence endings found, look for any subtitle end in range
-        valid_ends = [s.get('end', 0) for s in subtitles 
-                     if min_duration <= s.get('end', 0) <= max_duration]
+        if best_sentence_end is not None:
+            self.logger.info(f"Found natural break at {best_sentence_end:.1f}s")
+            return best_sentence_end
         
-        if valid_ends:
-            target_middle = (min_duration + max_duration) / 2
-            return min(valid_ends, key=lambda x: abs(x - target_middle))
+        # No good sentence endings found, use any subtitle end in range
+        if best_any_end is not None:
+            return best_any_end
         
         # Fall back to max duration or video duration
         return min(max_duration, video_duration)
@@ -198,6 +519,8 @@ class VideoProcessor:
             Video with subtitles
         """
         subtitle_clips = []
+        max_width = int(video.w * 0.8)  # 80% of video width
+        rendered = {}  # Repeated phrases are only rendered once
         
         for subtitle in subtitles:
             start_time = subtitle.get('start', 0)
@@ -216,16 +539,11 @@ class VideoProcessor:
             
             # Create styled text clip
             try:
-                txt_clip = TextClip(
-                    text,
-                    fontsize=60,
-                    font='Arial-Bold',
-                    color='white',
-                    stroke_color='black',
-                    stroke_width=3,
-                    method='caption',
-                    size=(video.w * 0.8, None)  # 80% of video width
-                ).set_start(start_time).set_duration(duration)
+                if text not in rendered:
+                    rendered[text] = self._render_subtitle_image(text, max_width)
+                
+                txt_clip = ImageClip(rendered[text], transparent=True)
+                txt_clip = txt_clip.set_start(start_time).set_duration(duration)
                 
                 # Position subtitle at bottom of screen
                 txt_clip = txt_clip.set_position(('center', video.h * 0.75))
@@ -240,6 +558,74 @@ class VideoProcessor:
         else:
             return video
     
+    def _get_subtitle_font(self) -> ImageFont.ImageFont:
+        """
+        Load the subtitle font, falling back to Pillow's default font
+        
+        Returns:
+            Font used for subtitle rendering
+        """
+        if self._subtitle_font is None:
+            for font_name in _SUBTITLE_FONTS:
+                try:
+                    self._subtitle_font = ImageFont.truetype(font_name, self.subtitle_font_size)
+                    break
+                except OSError:
+                    continue
+            else:
+                self.logger.warning("No bold TrueType font found, using Pillow default font")
+                try:
+                    self._subtitle_font = ImageFont.load_default(size=self.subtitle_font_size)
+                except TypeError:  # Pillow < 10.1
+                    self._subtitle_font = ImageFont.load_default()
+        
+        return self._subtitle_font
+    
+    def _render_subtitle_image(self, text: str, max_width: int) -> np.ndarray:
+        """
+        Render subtitle text as white outlined lines on a transparent layer
+        
+        Args:
+            text: Subtitle text
+            max_width: Maximum line width in pixels
+            
+        Returns:
+            RGBA image array
+        """
+        font = self._get_subtitle_font()
+        stroke = self.subtitle_stroke_width
+        measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+        
+        # Greedy word wrap to the available width
+        lines = []
+        current = ''
+        for word in text.split():
+            candidate = f"{current} {word}" if current else word
+            if current and measure.textlength(candidate, font=font) + 2 * stroke > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        if current:
+            lines.append(current)
+        wrapped = '\n'.join(lines)
+        
+        left, top, right, bottom = measure.multiline_textbbox(
+            (0, 0), wrapped, font=font, align='center', stroke_width=stroke
+        )
+        image = Image.new('RGBA', (max(right - left, 1), max(bottom - top, 1)), (0, 0, 0, 0))
+        ImageDraw.Draw(image).multiline_text(
+            (-left, -top),
+            wrapped,
+            font=font,
+            fill='white',
+            align='center',
+            stroke_width=stroke,
+            stroke_fill='black'
+        )
+        
+        return np.array(image)
+    
     def get_video_duration(self, video_path: str) -> float:
         """
         Get duration of video file
@@ -250,6 +636,9 @@ class VideoProcessor:
         Returns:
             Duration in seconds
         """
+        if self.use_ffmpeg:
+            return self._probe_video(video_path).get('duration', 0.0)
+        
         try:
             with VideoFileClip(video_path) as video:
                 return video.duration or 0.0
@@ -267,6 +656,17 @@ class VideoProcessor:
         Returns:
             Dictionary with video info
         """
+        if self.use_ffmpeg:
+            probe = self._probe_video(video_path)
+            if not probe:
+                return {}
+            return {
+                'duration': probe['duration'],
+                'size': [probe['width'], probe['height']],
+                'fps': probe['fps'],
+                'audio': probe['audio']
+            }
+        
         try:
             with VideoFileClip(video_path) as video:
                 return {
@@ -3,37 +3,89 @@ Subtitle generation module using OpenAI Whisper
 Handles ASR and subtitle creation
 """
 
+import functools
 import logging
+import subprocess
 import tempfile
 import os
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable
 import json
 
 try:
     import whisper
+    import torch
 except ImportError:
     raise ImportError("openai-whisper not installed. Run: pip install openai-whisper")
 
 try:
-    from moviepy.editor import VideoFileClip
+    from faster_whisper import WhisperModel
 except ImportError:
-    raise ImportError("moviepy not installed. Run: pip install moviepy")
+    WhisperModel = None  # Optional CTranslate2 backend
 
-from utils import handle_error
+from utils import handle_error, get_cache, hash_file, remove_file_async, write_srt, TRANSCRIPT_CACHE_TTL
+
+# Supported transcription backends
+BACKENDS = ("whisper", "faster-whisper")
+
+# Punctuation that closes a grouped word subtitle
+_PUNCT = frozenset('.!?,')
+
+@functools.lru_cache(maxsize=2)
+def _get_model(model_name: str, device: str, backend: str = "whisper"):
+    """
+    Load a Whisper model, reusing it for every generator with the same settings
+    
+    Models are downloaded to $WHISPER_MODEL_DIR if set, otherwise to
+    the backend's default cache directory.
+    
+    Args:
+        model_name: Whisper model to load
+        device: Torch device ('cuda' or 'cpu')
+        backend: Transcription backend ('whisper' or 'faster-whisper')
+        
+    Returns:
+        Loaded model
+    """
+    download_root = os.environ.get('WHISPER_MODEL_DIR')
+    
+    if backend == "faster-whisper":
+        if WhisperModel is None:
+            raise ImportError("faster-whisper not installed. Run: pip install faster-whisper")
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+        return WhisperModel(
+            model_name,
+            device=device,
+            compute_type=compute_type,
+            download_root=download_root
+        )
+    
+    return whisper.load_model(
+        model_name,
+        device=device,
+        download_root=download_root
+    )
 
 class SubtitleGenerator:
     """Handles subtitle generation using OpenAI Whisper"""
     
-    def __init__(self, model_name: str = "base"):
+    def __init__(self, model_name: str = "base", device: Optional[str] = None,
+                 backend: str = "whisper"):
         """
         Initialize the subtitle generator
         
         Args:
             model_name: Whisper model to use (tiny, base, small, medium, large)
+            device: Torch device to run on (CUDA if available when None)
+            backend: Transcription backend ('whisper' or 'faster-whisper')
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        
         self.logger = logging.getLogger(__name__)
         self.model_name = model_name
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.backend = backend
         self.model = None
         
         # Load Whisper model
@@ -42,21 +94,23 @@ class SubtitleGenerator:
     def _load_model(self):
         """Load the Whisper model"""
         try:
-            self.logger.info(f"Loading Whisper model: {self.model_name}")
-            self.model = whisper.load_model(self.model_name)
+            self.logger.info(f"Loading Whisper model: {self.model_name} ({self.backend}, {self.device})")
+            self.model = _get_model(self.model_name, self.device, self.backend)
             self.logger.info("Whisper model loaded successfully")
         except Exception as e:
             self.logger.error(f"Failed to load Whisper model: {e}")
             print(f"❌ Failed to load Whisper model: {e}")
             raise
     
-    def generate_subtitles(self, video_path: str, language: str = None) -> List[Dict[str, Any]]:
+    def generate_subtitles(self, video_path: str, language: str = None,
+                           label: str = "") -> List[Dict[str, Any]]:
         """
         Generate subtitles from video audio
         
         Args:
             video_path: Path to video file
             language: Language code (auto-detect if None)
+            label: Prefix for progress messages, e.g. "[1/3] "
             
         Returns:
             List of subtitle segments with start, end, and text
@@ -67,23 +121,47 @@ class SubtitleGenerator:
             if not audio_path:
                 return []
             
-            # Transcribe audio using Whisper
+            # Reuse a previous transcript of identical audio. The cache is
+            # optional, so any failure there just means transcribing again.
+            cache = None
+            cache_key = None
+            try:
+                cache = get_cache()
+                if cache is not None:
+                    cache_key = ('transcript', self.backend, self.model_name, language,
+                                 hash_file(audio_path))
+                    subtitles = cache.get(cache_key)
+                    if subtitles is not None:
+                        self.logger.info("Using cached transcript")
+                        remove_file_async(audio_path)
+                        return subtitles
+            except Exception as e:
+                self.logger.warning(f"Transcript cache unavailable, continuing without it: {e}")
+                cache_key = None
+            
+            # Transcribe audio using Whisper (segment timings only; word
+            # alignment is an extra pass and only needed for the fallback)
             self.logger.info("Transcribing audio with Whisper...")
-            result = self.model.transcribe(
-                audio_path,
-                language=language,
-                word_timestamps=True,
-                verbose=False
-            )
+            result = self._transcribe(audio_path, language)
             
-            # Clean up temporary audio file
-            try:
-                os.remove(audio_path)
-            except:
-                pass
+            def load_words() -> List[Dict[str, Any]]:
+                self.logger.info("No usable segments, re-transcribing with word timestamps...")
+                detailed = self._transcribe(audio_path, language, word_timestamps=True)
+                return [word for segment in detailed.get('segments', [])
+                        for word in segment.get('words', [])]
             
             # Convert Whisper output to subtitle format
-            subtitles = self._process_whisper_result(result)
+            try:
+                subtitles = self._process_whisper_result(result, load_words)
+            finally:
+                # Clean up temporary audio file
+                remove_file_async(audio_path)
+            
+            if cache_key is not None:
+                try:
+                    cache.set(cache_key, subtitles, expire=TRANSCRIPT_CACHE_TTL)
+                except Exception as e:
+                    self.logger.warning(f"Could not cache transcript: {e}")
             
             self.logger.info(f"Generated {len(subtitles)} subtitle segments")
             return subtitles
@@ -91,12 +169,58 @@ class SubtitleGenerator:
         except Exception as e:
             error_msg = handle_error(e, "generating subtitles")
             self.logger.error(f"Subtitle generation error: {e}")
-            print(f"❌ Subtitle error: {error_msg}")
+            print(f"❌ {label}Subtitle error: {error_msg}")
             return []
     
+    def _transcribe(self, audio_path: str, language: Optional[str] = None,
+                    word_timestamps: bool = False) -> Dict[str, Any]:
+        """
+        Transcribe audio with the configured backend
+        
+        Args:
+            audio_path: Path to audio file
+            language: Language code (auto-detect if None)
+            word_timestamps: Whether to compute per-word timings
+            
+        Returns:
+            Transcription result in openai-whisper's format
+        """
+        if self.backend == "faster-whisper":
+            segments, _ = self.model.transcribe(
+                audio_path,
+                language=language,
+                word_timestamps=word_timestamps
+            )
+            
+            # Consume the lazy segment generator into whisper's dict shape
+            result_segments = [
+                {
+                    'start': segment.start,
+                    'end': segment.end,
+                    'text': segment.text,
+                    'words': [
+                        {'start': word.start, 'end': word.end, 'word': word.word}
+                        for word in (segment.words or [])
+                    ]
+                }
+                for segment in segments
+            ]
+            return {
+                'segments': result_segments,
+                'text': ''.join(segment['text'] for segment in result_segments)
+            }
+        
+        return self.model.transcribe(
+            audio_path,
+            language=language,
+            word_timestamps=word_timestamps,
+            fp16=(self.device == "cuda"),
+            verbose=False
+        )
+    
     def _extract_audio(self, video_path: str) -> Optional[str]:
         """
-        Extract audio from video file
+        Extract audio from video file as 16 kHz mono WAV (Whisper's native format)
         
         Args:
             video_path: Path to video file
@@ -104,59 +228,73 @@ class SubtitleGenerator:
         Returns:
             Path to extracted audio file or None if failed
         """
+        temp_audio_path = None
         try:
-            with VideoFileClip(video_path) as video:
-                if not video.audio:
+            # Create temporary audio file
+            temp_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+            temp_audio_path = temp_audio.name
+            temp_audio.close()
+            
+            # Decode and resample in a single ffmpeg pass
+            result = subprocess.run(
+                ['ffmpeg', '-y', '-loglevel', 'error', '-i', str(video_path),
+                 '-map', '0:a:0', '-vn', '-ac', '1', '-ar', '16000', '-f', 'wav',
+                 temp_audio_path],
+                capture_output=True,
+                text=True
+            )
+            
+            if result.returncode != 0:
+                if 'matches no streams' in result.stderr:
                     self.logger.warning("Video has no audio track")
-                    return None
-                
-                # Create temporary audio file
-                temp_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                temp_audio_path = temp_audio.name
-                temp_audio.close()
-                
-                # Extract audio
-                video.audio.write_audiofile(
-                    temp_audio_path,
-                    verbose=False,
-                    logger=None
-                )
-                
-                return temp_audio_path
-                
+                else:
+                    self.logger.error(f"Error extracting audio: {result.stderr.strip()}")
+                os.remove(temp_audio_path)
+                return None
+            
+            return temp_audio_path
+            
         except Exception as e:
             self.logger.error(f"Error extracting audio: {e}")
+            if temp_audio_path and os.path.exists(temp_audio_path):
+                os.remove(temp_audio_path)
             return None
     
-    def _process_whisper_result(self, result: Dict) -> List[Dict[str, Any]]:
+    def _process_whisper_result(self, result: Dict,
+                                load_words: Optional[Callable[[], List[Dict]]] = None) -> List[Dict[str, Any]]:
         """
         Process Whisper transcription result into subtitle format
         
         Args:
             result: Whisper transcription result
+            load_words: Optional function returning word timings, called only
+                if the segments are unusable and the result has no words
             
         Returns:
             List of subtitle segments
         """
-        subtitles = []
-        
         # Use segments for better timing
         segments = result.get('segments', [])
         
-        for segment in segments:
-            subtitle = {
+        subtitles = [
+            {
                 'start': segment.get('start', 0),
                 'end': segment.get('end', 0),
                 'text': segment.get('text', '').strip()
             }
-            
-            # Skip empty or very short segments
-            if subtitle['text'] and (subtitle['end'] - subtitle['start']) > 0.1:
-                subtitles.append(subtitle)
+            for segment in segments
+        ]
+        
+        # Skip empty or very short segments
+        subtitles = [s for s in subtitles if s['text'] and (s['end'] - s['start']) > 0.1]
         
-        # If no segments, fall back to words with grouping
-        if not subtitles and 'words' in result:
-            subtitles = self._group_words_into_subtitles(result['words'])
+        # If no usable segments, fall back to words with grouping
+        if not subtitles:
+            words = result.get('words') or [word for segment in segments
+                                            for word in segment.get('words', [])]
+            if not words and segments and load_words:
+                words = load_words()
+            subtitles = self._group_words_into_subtitles(words)
         
         # Final fallback to full text
         if not subtitles and result.get('text'):
@@ -190,8 +328,7 @@ class SubtitleGenerator:
             
             # Create subtitle if we have enough words or hit punctuation
             word_text = word.get('word', '').strip()
-            if (len(current_words) >= max_words or 
-                any(punct in word_text for punct in ['.', '!', '?', ','])):
+            if len(current_words) >= max_words or not _PUNCT.isdisjoint(word_text):
                 
                 if current_words:
                     subtitle = {
@@ -225,15 +362,7 @@ class SubtitleGenerator:
             True if successful, False otherwise
         """
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                for i, subtitle in enumerate(subtitles, 1):
-                    start_time = self._seconds_to_srt_time(subtitle['start'])
-                    end_time = self._seconds_to_srt_time(subtitle['end'])
-                    
-                    f.write(f"{i}\n")
-                    f.write(f"{start_time} --> {end_time}\n")
-                    f.write(f"{subtitle['text']}\n\n")
-            
+            write_srt(subtitles, output_path)
             self.logger.info(f"SRT file exported: {output_path}")
             return True
             
@@ -241,23 +370,6 @@ class SubtitleGenerator:
             self.logger.error(f"Error exporting SRT: {e}")
             return False
     
-    def _seconds_to_srt_time(self, seconds: float) -> str:
-        """
-        Convert seconds to SRT time format
-        
-        Args:
-            seconds: Time in seconds
-            
-        Returns:
-            Time in SRT format (HH:MM:SS,mmm)
-        """
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millisecs = int((seconds % 1) * 1000)
-        
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
-    
     def detect_language(self, audio_path: str) -> str:
         """
         Detect language from audio file
@@ -269,6 +381,12 @@ class SubtitleGenerator:
             Detected language code
         """
         try:
+            if self.backend == "faster-whisper":
+                # Language is detected up front; segments are decoded lazily
+                _, info = self.model.transcribe(audio_path)
+                self.logger.info(f"Detected language: {info.language}")
+                return info.language
+            
             # Load audio and pad/trim it to fit 30 seconds
             audio = whisper.load_audio(audio_path)
             audio = whisper.pad_or_trim(audio)
@@ -285,4 +403,4 @@ class SubtitleGenerator:
             
         except Exception as e:
             self.logger.error(f"Error detecting language: {e}")
-            return "en"  # Default to English
+            return "en"  # Default to English
\ No newline at end of file
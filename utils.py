@@ -3,14 +3,82 @@ Utility functions for ClipLord
 Handles logging, validation, error handling, and helper functions
 """
 
+import atexit
+import functools
 import logging
+import logging.handlers
+import hashlib
+import importlib.util
 import re
 import os
+import platform
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from urllib.parse import urlparse
 
+try:
+    from diskcache import Cache
+except ImportError:
+    Cache = None  # Caching is optional; everything works without it
+
+try:
+    import psutil
+except ImportError:
+    psutil = None  # Only needed by get_system_info
+
+# On-disk cache settings
+CACHE_DIR = ".cliplord-cache"
+METADATA_CACHE_TTL = 24 * 60 * 60  # 24 hours
+TRANSCRIPT_CACHE_TTL = 7 * 24 * 60 * 60  # 7 days
+
+_cache = None
+_cache_enabled = True
+
+# Background worker for temp file deletion
+_cleanup_executor = None
+_cleanup_lock = threading.Lock()
+
+# YouTube URL pattern (watch, embed, v, shorts and youtu.be links). The
+# video ID is exactly 11 characters and may only be followed by an optional
+# slash and a query string/fragment, so the whole URL must match.
+_YT_RE = re.compile(
+    r'(?:https?://)?'
+    r'(?:(?:www\.)?youtube\.com/(?:watch\?v=|embed/|v/|shorts/)|youtu\.be/)'
+    r'([a-zA-Z0-9_-]{11})'
+    r'/?(?:[?&#].*)?$'
+)
+
+# Characters replaced in filenames (runs collapse to one underscore)
+_FNAME_RE = re.compile(r'[<>:"/\\|?*\s_]+')
+
+# Characters stripped from subtitle text, and whitespace runs
+_SUBTITLE_BAD_CHARS_RE = re.compile(r'[^\w\s.,!?\-\'"()]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Friendly messages for common errors, checked in order
+_ERROR_MESSAGES = [
+    (re.compile(r'HTTP Error 403'), "Video unavailable (private/restricted)"),
+    (re.compile(r'HTTP Error 404'), "Video not found"),
+    (re.compile(r'No video formats found'), "No downloadable video found"),
+    (re.compile(r'network|connection', re.IGNORECASE), "Network connection error"),
+]
+
+# File size units, each 1024 times the previous
+_SIZE_NAMES = ("B", "KB", "MB", "GB", "TB")
+
+# Extensions accepted as video files
+_VALID_VIDEO_EXTS = frozenset({'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'})
+
+# Required (module, pip package) pairs
+_REQUIRED_PACKAGES = (
+    ('yt_dlp', 'yt-dlp'),
+    ('moviepy', 'moviepy'),
+    ('whisper', 'openai-whisper'),
+)
+
 def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None):
     """
     Setup logging configuration
@@ -19,48 +87,168 @@ def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None):
         level: Logging level
         log_file: Optional log file path
     """
-    # Create logs directory if logging to file
+    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    file_handler = logging.NullHandler()
+    
     if log_file:
+        # Create logs directory if logging to file
         log_path = Path(log_file)
         log_path.parent.mkdir(exist_ok=True)
+        
+        # Buffer records instead of flushing the file on every one; errors
+        # and interpreter shutdown flush the buffer immediately
+        target = logging.FileHandler(log_file)
+        target.setFormatter(logging.Formatter(log_format))
+        file_handler = logging.handlers.MemoryHandler(
+            capacity=1000,
+            flushLevel=logging.ERROR,
+            target=target
+        )
     
     # Configure logging
     logging.basicConfig(
         level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        format=log_format,
         handlers=[
             logging.StreamHandler(sys.stdout),
-            logging.FileHandler(log_file) if log_file else logging.NullHandler()
+            file_handler
         ]
     )
 
-def validate_url(url: str) -> bool:
+def get_cache():
     """
-    Validate if URL is a valid YouTube URL
+    Get the shared on-disk cache
+    
+    Returns:
+        diskcache Cache instance, or None if caching is disabled or unavailable
+    """
+    global _cache
+    
+    if not _cache_enabled or Cache is None:
+        return None
+    
+    if _cache is None:
+        _cache = Cache(CACHE_DIR)
+    
+    return _cache
+
+def set_cache_enabled(enabled: bool):
+    """
+    Enable or disable the on-disk cache
     
     Args:
-        url: URL to validate
+        enabled: Whether cached results may be read and written
+    """
+    global _cache_enabled
+    _cache_enabled = enabled
+
+def clear_cache() -> bool:
+    """
+    Remove all entries from the on-disk cache
+    
+    Returns:
+        True if the cache was cleared, False if caching is unavailable
+    """
+    if Cache is None:
+        return False
+    
+    cache = _cache if _cache is not None else Cache(CACHE_DIR)
+    cache.clear()
+    return True
+
+def hash_file(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute SHA-256 digest of a file without loading it into memory
+    
+    Args:
+        file_path: Path to file
+        chunk_size: Number of bytes read per iteration
         
     Returns:
-        True if valid YouTube URL, False otherwise
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _get_cleanup_executor() -> ThreadPoolExecutor:
+    """
+    Get the background cleanup executor, creating it on first use
+    
+    Returns:
+        Single-worker executor that is drained at interpreter exit
+    """
+    global _cleanup_executor
+    
+    with _cleanup_lock:
+        if _cleanup_executor is None:
+            _cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cliplord-cleanup")
+            atexit.register(_cleanup_executor.shutdown, wait=True)
+    
+    return _cleanup_executor
+
+def _remove_file(file_path: Union[str, Path]):
+    """
+    Delete a file, logging instead of raising on failure
+    
+    Args:
+        file_path: Path to file
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        os.remove(file_path)
+        logger.debug("Cleaned up: %s", file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not clean up {file_path}: {e}")
+
+def remove_file_async(file_path: Union[str, Path]) -> Future:
+    """
+    Delete a file in the background so callers don't block on disk I/O
+    
+    Args:
+        file_path: Path to file
+        
+    Returns:
+        Future that completes once the file is removed
+    """
+    return _get_cleanup_executor().submit(_remove_file, file_path)
+
+def parse_youtube_url(url: str) -> Optional[str]:
+    """
+    Validate a YouTube URL and extract its video ID in one pass
+    
+    Args:
+        url: URL to parse
+        
+    Returns:
+        11-character video ID, or None if not a valid YouTube URL
     """
     if not url or not isinstance(url, str):
-        return False
+        return None
     
-    # YouTube URL patterns
-    youtube_patterns = [
-        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]+)',
-        r'(?:https?://)?(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]+)',
-        r'(?:https?://)?(?:www\.)?youtube\.com/v/([a-zA-Z0-9_-]+)',
-        r'(?:https?://)?youtu\.be/([a-zA-Z0-9_-]+)',
-        r'(?:https?://)?(?:www\.)?youtube\.com/shorts/([a-zA-Z0-9_-]+)'
-    ]
+    # Cheap substring check rejects most non-YouTube URLs before the regex
+    url_stripped = url.strip()
+    if 'youtu' not in url_stripped:
+        return None
     
-    for pattern in youtube_patterns:
-        if re.match(pattern, url.strip()):
-            return True
+    match = _YT_RE.match(url_stripped)
+    return match.group(1) if match else None
+
+def validate_url(url: str) -> bool:
+    """
+    Validate if URL is a valid YouTube URL
     
-    return False
+    Args:
+        url: URL to validate
+        
+    Returns:
+        True if valid YouTube URL, False otherwise
+    """
+    return parse_youtube_url(url) is not None
 
 def clean_filename(filename: str, max_length: int = 100) -> str:
     """
@@ -76,17 +264,9 @@ def clean_filename(filename: str, max_length: int = 100) -> str:
     if not filename:
         return "unknown_video"
     
-    # Remove/replace invalid characters
-    cleaned = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    
-    # Remove extra whitespace and replace with underscores
-    cleaned = re.sub(r'\s+', '_', cleaned.strip())
-    
-    # Remove consecutive underscores
-    cleaned = re.sub(r'_+', '_', cleaned)
-    
-    # Remove leading/trailing underscores
-    cleaned = cleaned.strip('_')
+    # Replace runs of invalid characters, whitespace and underscores with a
+    # single underscore, then remove leading/trailing underscores
+    cleaned = _FNAME_RE.sub('_', filename).strip('_')
     
     # Limit length
     if len(cleaned) > max_length:
@@ -113,16 +293,12 @@ def handle_error(error: Exception, context: str = "") -> str:
     error_msg = str(error)
     
     # Clean up common error messages
-    if "HTTP Error 403" in error_msg:
-        return "Video unavailable (private/restricted)"
-    elif "HTTP Error 404" in error_msg:
-        return "Video not found"
-    elif "No video formats found" in error_msg:
-        return "No downloadable video found"
-    elif "network" in error_msg.lower() or "connection" in error_msg.lower():
-        return "Network connection error"
-    elif len(error_msg) > 100:
-        return f"{error_type}: {error_msg[:97]}..."
+    for pattern, friendly_msg in _ERROR_MESSAGES:
+        if pattern.search(error_msg):
+            return friendly_msg
+    
+    if len(error_msg) > 100:
+        return f"{error_type}: {error_msg:.97s}..."
     
     if context:
         return f"Error {context}: {error_msg}"
@@ -141,14 +317,13 @@ def format_duration(seconds: float) -> str:
     """
     if seconds < 60:
         return f"{seconds:.1f}s"
-    elif seconds < 3600:
-        minutes = int(seconds // 60)
-        remaining_seconds = int(seconds % 60)
+    
+    minutes, remaining_seconds = divmod(int(seconds), 60)
+    if minutes < 60:
         return f"{minutes}m {remaining_seconds}s"
-    else:
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        return f"{hours}h {minutes}m"
+    
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m"
 
 def ensure_directory(path: Union[str, Path]) -> Path:
     """
@@ -160,9 +335,8 @@ def ensure_directory(path: Union[str, Path]) -> Path:
     Returns:
         Path object
     """
-    path_obj = Path(path)
-    path_obj.mkdir(parents=True, exist_ok=True)
-    return path_obj
+    os.makedirs(path, exist_ok=True)
+    return path if isinstance(path, Path) else Path(path)
 
 def get_file_size(file_path: Union[str, Path]) -> int:
     """
@@ -175,8 +349,8 @@ def get_file_size(file_path: Union[str, Path]) -> int:
         File size in bytes, 0 if file doesn't exist
     """
     try:
-        return Path(file_path).stat().st_size
-    except (OSError, FileNotFoundError):
+        return os.path.getsize(file_path)
+    except OSError:
         return 0
 
 def format_file_size(size_bytes: int) -> str:
@@ -192,13 +366,15 @@ def format_file_size(size_bytes: int) -> str:
     if size_bytes == 0:
         return "0B"
     
-    size_names = ["B", "KB", "MB", "GB", "TB"]
-    i = 0
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
+    # Fractional and negative sizes stay in bytes
+    if size_bytes < 1024:
+        return f"{size_bytes:.1f}B"
+    
+    # Each unit is 2**10 larger, so the bit length gives the unit directly
+    i = min((abs(int(size_bytes)).bit_length() - 1) // 10, len(_SIZE_NAMES) - 1)
+    value = size_bytes / (1 << (i * 10))
     
-    return f"{size_bytes:.1f}{size_names[i]}"
+    return f"{value:.1f}{_SIZE_NAMES[i]}"
 
 def validate_video_file(file_path: Union[str, Path]) -> bool:
     """
@@ -210,19 +386,17 @@ def validate_video_file(file_path: Union[str, Path]) -> bool:
     Returns:
         True if valid video file, False otherwise
     """
-    if not Path(file_path).exists():
-        return False
+    path = Path(file_path)
     
     # Check file extension
-    valid_extensions = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'}
-    if Path(file_path).suffix.lower() not in valid_extensions:
+    if path.suffix.lower() not in _VALID_VIDEO_EXTS:
         return False
     
-    # Check file size (should be > 0)
-    if get_file_size(file_path) == 0:
+    # One stat covers both existence and size (should be > 0)
+    try:
+        return path.stat().st_size > 0
+    except OSError:
         return False
-    
-    return True
 
 def extract_video_id(url: str) -> Optional[str]:
     """
@@ -234,18 +408,7 @@ def extract_video_id(url: str) -> Optional[str]:
     Returns:
         Video ID or None if not found
     """
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-        r'(?:embed\/)([0-9A-Za-z_-]{11})',
-        r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    
-    return None
+    return parse_youtube_url(url)
 
 def create_progress_bar(current: int, total: int, width: int = 50) -> str:
     """
@@ -264,7 +427,7 @@ def create_progress_bar(current: int, total: int, width: int = 50) -> str:
     
     progress = current / total
     filled = int(width * progress)
-    bar = "=" * filled + "-" * (width - filled)
+    bar = ("=" * filled).ljust(width, "-")
     percentage = progress * 100
     
     return f"[{bar}] {percentage:.1f}%"
@@ -282,11 +445,10 @@ def sanitize_text(text: str) -> str:
     if not text:
         return ""
     
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text.strip())
-    
-    # Remove special characters that might cause issues
-    text = re.sub(r'[^\w\s\.,!?\-\'"()]', '', text)
+    # Remove special characters that might cause issues, then collapse the
+    # remaining whitespace so removed characters don't leave double spaces
+    text = _SUBTITLE_BAD_CHARS_RE.sub('', text)
+    text = _WHITESPACE_RE.sub(' ', text).strip()
     
     # Limit length for subtitles
     max_length = 100
@@ -301,6 +463,40 @@ def sanitize_text(text: str) -> str:
     
     return text
 
+def write_srt(subtitles: List[Dict[str, Any]], output_path: str):
+    """
+    Write subtitle segments to an SRT file
+    
+    Args:
+        subtitles: List of subtitle segments
+        output_path: Path for SRT file
+    """
+    body = ''.join(
+        f"{i}\n"
+        f"{_seconds_to_srt_time(subtitle['start'])} --> {_seconds_to_srt_time(subtitle['end'])}\n"
+        f"{subtitle['text']}\n\n"
+        for i, subtitle in enumerate(subtitles, 1)
+    )
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(body)
+
+def _seconds_to_srt_time(seconds: float) -> str:
+    """
+    Convert seconds to SRT time format
+    
+    Args:
+        seconds: Time in seconds
+        
+    Returns:
+        Time in SRT format (HH:MM:SS,mmm)
+    """
+    secs, millisecs = divmod(int(seconds * 1000), 1000)
+    minutes, secs = divmod(secs, 60)
+    hours, minutes = divmod(minutes, 60)
+    
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
+
 def check_dependencies():
     """
     Check if all required dependencies are available
@@ -308,18 +504,9 @@ def check_dependencies():
     Returns:
         True if all dependencies available, False otherwise
     """
-    required_packages = {
-        'yt_dlp': 'yt-dlp',
-        'moviepy': 'moviepy',
-        'whisper': 'openai-whisper'
-    }
-    
-    missing = []
-    for module, package in required_packages.items():
-        try:
-            __import__(module)
-        except ImportError:
-            missing.append(package)
+    # find_spec only locates the module, without running its (heavy) import
+    missing = [package for module, package in _REQUIRED_PACKAGES
+               if importlib.util.find_spec(module) is None]
     
     if missing:
         print(f"❌ Missing required packages: {', '.join(missing)}")
@@ -328,20 +515,35 @@ def check_dependencies():
     
     return True
 
+@functools.lru_cache(maxsize=1)
+def _get_static_system_info() -> dict:
+    """
+    Get system information that doesn't change during a run
+    
+    Returns:
+        Dictionary with platform, Python version, CPU count and total memory
+    """
+    return {
+        'platform': platform.platform(),
+        'python_version': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'memory_gb': round(psutil.virtual_memory().total / (1024**3), 1)
+    }
+
 def get_system_info() -> dict:
     """
     Get basic system information
     
+    Static fields are computed once per process; free disk space is
+    measured on every call.
+    
     Returns:
         Dictionary with system info
     """
-    import platform
-    import psutil
+    if psutil is None:
+        raise ImportError("psutil not installed. Run: pip install psutil")
     
     return {
-        'platform': platform.platform(),
-        'python_version': platform.python_version(),
-        'cpu_count': os.cpu_count(),
-        'memory_gb': round(psutil.virtual_memory().total / (1024**3), 1),
+        **_get_static_system_info(),
         'disk_free_gb': round(psutil.disk_usage('.').free / (1024**3), 1)
-    }
+    }
\ No newline at end of file